@@ -6,8 +6,8 @@ Description: This script is the only tool within the KH GA LISST toolbox.
 GA LISST is the acronym for the Georgia Low Impact for Solar Siting Tool. More information for the LISST can be found here
 (https://www.nature.org/en-us/about-us/where-we-work/united-states/georgia/stories-in-georgia/low-impact-solar-renewable-energy/?vu=georgiasolar).
 
-This script is designed to retrieve the GA LISST data from the REST, convert the raster data into a polygon layer, clip the dataset to within a project's boundary, 
-and calculate acreages for each of the LISST's ranks.
+This script is designed to retrieve the GA LISST data from the REST, convert the raster cells whose centers fall within a project's boundary
+into a polygon layer, and calculate acreages for each of the LISST's ranks.
 
 The ranks defined by the LISST are as follows:
     - "Most preferred for low impact"
@@ -29,33 +29,126 @@ Returns:
 
 # Import system modules
 import arcpy
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import json
+import math
+import numpy
 import os
-import traceback
+import tempfile
+import urllib.parse
+import urllib.request
+
+# Properties shared by the toolbox and its tool
+TOOL_LABEL = "GA LISST"
+TOOL_ALIAS = "GALISST"
+TOOL_DESCRIPTION = "Retrieves the Georgia Low Impact for Solar Siting Tool data for the input site boundary and calculates acreages for each rank."
+TOOL_CATEGORY = "Process GA LISST"
+
+# Square meters in one acre
+SQ_METERS_PER_ACRE = 4046.8564224
+
+# Equal-area projection used to calculate acreages when the input boundary is not projected (NAD83 / Conus Albers)
+EQUAL_AREA_WKID = 5070
+
+# Width and height of the tiles the buffered boundary is processed in
+TILE_SIZE = "10 Kilometers"
+
+# Folder and number of LISST tiles cached between runs
+TILE_CACHE_FOLDER = os.path.join(os.environ.get("LOCALAPPDATA", tempfile.gettempdir()), "kh_ga_lisst", "tilecache")
+TILE_CACHE_SIZE = 200
+
+# Raster pixel types keyed by the image service's pixel type
+PIXEL_TYPES = {
+    "U1": "1_BIT", "U2": "2_BIT", "U4": "4_BIT",
+    "U8": "8_BIT_UNSIGNED", "S8": "8_BIT_SIGNED",
+    "U16": "16_BIT_UNSIGNED", "S16": "16_BIT_SIGNED",
+    "U32": "32_BIT_UNSIGNED", "S32": "32_BIT_SIGNED",
+    "F32": "32_BIT_FLOAT", "F64": "64_BIT",
+}
+
+# JSON descriptions of the REST services fetched during this session, keyed by URL
+_DESC_CACHE = {}
+
+@contextlib.contextmanager
+def _spatial_license():
+    """Check out the Spatial Analyst extension for the duration of the block, then check it back in."""
+    arcpy.CheckOutExtension("Spatial")
+    try:
+        yield
+    finally:
+        arcpy.CheckInExtension("Spatial")
+
+def _count_values(arr, n_values, nodata=None):
+    """Count the cells of each value with a single numpy.bincount pass, skipping NoData, non-finite, and negative cells.
+
+    Args:
+        arr (numpy.ndarray): The cell values.
+        n_values (int): The minimum number of counts to return.
+        nodata (int or float, optional): The NoData value. Defaults to None.
+    Returns:
+        numpy.ndarray: The number of cells of each value, indexed by value.
+    """
+    valid = arr >= 0
+    if arr.dtype.kind == "f":
+        valid &= numpy.isfinite(arr)
+    if nodata is not None:
+        valid &= arr != nodata
+    return numpy.bincount(arr[valid].astype(numpy.int64), minlength=n_values)
+
+@functools.lru_cache(maxsize=None)
+def _get_rasterio():
+    """Import rasterio on first use, or return None if rasterio is not installed."""
+    try:
+        import rasterio.features
+        import rasterio.transform
+    except ImportError:
+        return None  # Fall back to RasterToPolygon when rasterio is not installed
+    return rasterio
+
+class MessageBuffer:
+    """Collect progress messages and write them to the geoprocessing messages in a single call."""
+
+    def __init__(self):
+        self.messages = []
+
+    def add(self, message):
+        """Queue a message to be written at the next flush."""
+        self.messages.append(message)
+
+    def flush(self):
+        """Write the queued messages as one geoprocessing message."""
+        if self.messages:
+            arcpy.AddMessage("\n".join(self.messages))
+            self.messages.clear()
 
 class Toolbox:
     """Retrieve and process the GA LISST dataset."""
 
+    # Define the toolbox (the name of the toolbox is the name of the .pyt file)
+    label = TOOL_LABEL
+    alias = TOOL_ALIAS
+    description = TOOL_DESCRIPTION
+    canRunInBackground = True
+    category = TOOL_CATEGORY
+
     def __init__(self):
-        """Define the tool's properties."""
-        self.label = "GA LISST"
-        self.alias = "GALISST"
-        self.description = "Retrieves the Georgia Low Impact for Solar Siting Tool data for the input site boundary and calculates acreages for each rank."
-        self.canRunInBackground = True
-        self.category = "Process GA LISST"
-        
+        """List the toolbox's tools; ProcessLISST is defined below this class."""
         # List of tool classes associated with this toolbox
         self.tools = [ProcessLISST]
 
 class ProcessLISST(object):
     """Retrieve and process the GA LISST dataset."""
 
-    def __init__(self):
-        """Define the tool's properties."""
-        self.label = "GA LISST"
-        self.alias = "GALISST"
-        self.description = "Retrieves the Georgia Low Impact for Solar Siting Tool data for the input site boundary and calculates acreages for each rank."
-        self.canRunInBackground = True
-        self.category = "Process GA LISST"
+    # Define the tool's properties
+    label = TOOL_LABEL
+    alias = TOOL_ALIAS
+    description = TOOL_DESCRIPTION
+    canRunInBackground = True
+    category = TOOL_CATEGORY
 
     def getParameterInfo(self):
         """Define parameter definitions."""
@@ -135,11 +228,21 @@ class ProcessLISST(object):
         # Input boundary checks
         if parameters[0].altered:
             if parameters[0].value:
-                desc = arcpy.Describe(parameters[0].value)
-                if desc.dataType not in ["FeatureClass", "Shapefile", "FeatureLayer"]:
-                    parameters[0].setErrorMessage("Input must be a feature class, feature layer, or shapefile.")
-                elif desc.shapeType != "Polygon":
-                    parameters[0].setErrorMessage("Input must be a polygon.")
+                # Validate the input boundary only when it has changed since the last validation
+                in_boundary = parameters[0].valueAsText
+                if getattr(self, "_last_validated", None) != in_boundary:
+                    desc = arcpy.Describe(parameters[0].value)
+                    if desc.dataType not in ["FeatureClass", "Shapefile", "FeatureLayer"]:
+                        self._boundary_error = "Input must be a feature class, feature layer, or shapefile."
+                    elif desc.shapeType != "Polygon":
+                        self._boundary_error = "Input must be a polygon."
+                    else:
+                        self._boundary_error = None
+                    self._last_validated = in_boundary
+
+                # Messages are cleared on every validation, so reapply the last result
+                if self._boundary_error:
+                    parameters[0].setErrorMessage(self._boundary_error)
         return
 
     def execute(self, parameters, messages):
@@ -174,6 +277,269 @@ class ProcessLISST(object):
             arcpy.AddError("Unable to access the current ArcGIS Pro project. Are you running this tool within ArcGIS Pro?")
             return None
 
+    @staticmethod
+    def get_service_spatial_reference(ga_lisst_rest):
+        """Build the GA LISST REST service's spatial reference from its JSON description."""
+        spatial_reference = ProcessLISST.get_service_json(ga_lisst_rest)["spatialReference"]
+        wkid = spatial_reference.get("latestWkid") or spatial_reference.get("wkid")
+        if wkid:
+            return arcpy.SpatialReference(wkid)
+        service_sr = arcpy.SpatialReference()
+        service_sr.loadFromString(spatial_reference["wkt"])
+        return service_sr
+
+    @staticmethod
+    def get_service_json(ga_lisst_rest, resource=""):
+        """Get a JSON resource of the GA LISST REST service, reusing the response from earlier runs.
+
+        Args:
+            ga_lisst_rest (str): URL of the GA LISST image service.
+            resource (str, optional): Path of the resource below the service URL. Defaults to the service itself.
+        Returns:
+            dict: The JSON response.
+        """
+        url = f"{ga_lisst_rest}{resource}?f=json"
+        if url not in _DESC_CACHE:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                service_json = json.load(response)
+            if "error" in service_json:
+                raise IOError(f"GA LISST REST request failed: {service_json['error'].get('message')}")
+            _DESC_CACHE[url] = service_json
+        return _DESC_CACHE[url]
+
+    @staticmethod
+    def get_service_ranks(ga_lisst_rest):
+        """Get the LISST rank of each cell value from the REST service's raster attribute table.
+
+        Args:
+            ga_lisst_rest (str): URL of the GA LISST image service.
+        Returns:
+            dict: A dictionary of LISST ranks keyed by cell value.
+        """
+        attribute_table = ProcessLISST.get_service_json(ga_lisst_rest, "/rasterAttributeTable")
+        return {feature["attributes"]["Value"]: feature["attributes"]["Rank"] for feature in attribute_table["features"]}
+
+    @staticmethod
+    def export_image(ga_lisst_rest, window, out_path):
+        """Download a window of the GA LISST service's pixel grid as a GeoTIFF with a single exportImage call.
+
+        Args:
+            ga_lisst_rest (str): URL of the GA LISST image service.
+            window (tuple): The first column, first row, last column, and last row (exclusive) of the window.
+            out_path (str): Path to the output GeoTIFF.
+        """
+        service_json = ProcessLISST.get_service_json(ga_lisst_rest)
+        size_x, size_y = service_json["pixelSizeX"], service_json["pixelSizeY"]
+        origin_x, origin_y = service_json["extent"]["xmin"], service_json["extent"]["ymax"]
+        col_min, row_min, col_max, row_max = window
+
+        spatial_reference = json.dumps(service_json["spatialReference"])
+        query = urllib.parse.urlencode({
+            "bbox": f"{origin_x + col_min * size_x},{origin_y - row_max * size_y},{origin_x + col_max * size_x},{origin_y - row_min * size_y}",
+            "bboxSR": spatial_reference,
+            "imageSR": spatial_reference,
+            "size": f"{col_max - col_min},{row_max - row_min}",
+            "format": "tiff",
+            "pixelType": service_json["pixelType"],
+            "interpolation": "RSP_NearestNeighbor",
+            "f": "image",
+        })
+        with urllib.request.urlopen(f"{ga_lisst_rest}/exportImage?{query}", timeout=300) as response:
+            if response.headers.get_content_type() != "image/tiff":
+                raise IOError(f"GA LISST REST exportImage failed: {response.read().decode(errors='replace')}")
+            download_path = f"{out_path}.part"
+            with open(download_path, "wb") as f:
+                f.write(response.read())
+        os.replace(download_path, out_path)
+
+    @staticmethod
+    def get_cached_raster(ga_lisst_rest, extent):
+        """Get the GA LISST raster covering an extent, downloading it from the REST only if it is not cached.
+
+        The raster is requested with exportImage in the service's own spatial reference and pixel grid, so the
+        cells are returned as-is without resampling. Windows larger than the service's maximum image size are
+        requested in parts and mosaicked.
+
+        Args:
+            ga_lisst_rest (str): URL of the GA LISST image service.
+            extent (arcpy.Extent): The extent of the raster to retrieve.
+        Returns:
+            arcpy.Raster: The GA LISST raster covering the extent.
+        """
+        service_json = ProcessLISST.get_service_json(ga_lisst_rest)
+        service_sr = ProcessLISST.get_service_spatial_reference(ga_lisst_rest)
+        if not service_sr.factoryCode or extent.spatialReference.factoryCode != service_sr.factoryCode:
+            extent = extent.projectAs(service_sr)
+
+        # Snap the extent outward to the service's pixel grid
+        size_x, size_y = service_json["pixelSizeX"], service_json["pixelSizeY"]
+        origin_x, origin_y = service_json["extent"]["xmin"], service_json["extent"]["ymax"]
+        col_min = math.floor((extent.XMin - origin_x) / size_x)
+        col_max = math.ceil((extent.XMax - origin_x) / size_x)
+        row_min = math.floor((origin_y - extent.YMax) / size_y)
+        row_max = math.ceil((origin_y - extent.YMin) / size_y)
+
+        # Key the cache on the service and the snapped pixel window
+        key = f"{ga_lisst_rest}|{col_min},{row_min},{col_max},{row_max}"
+        cache_path = os.path.join(TILE_CACHE_FOLDER, f"{hashlib.sha1(key.encode()).hexdigest()}.tif")
+
+        if os.path.exists(cache_path):
+            os.utime(cache_path)  # Mark the tile as recently used
+            return arcpy.Raster(cache_path)
+
+        # Split the pixel window into requests within the service's maximum image size
+        max_width = service_json.get("maxImageWidth") or col_max - col_min
+        max_height = service_json.get("maxImageHeight") or row_max - row_min
+        windows = [(col, row, min(col + max_width, col_max), min(row + max_height, row_max))
+                   for row in range(row_min, row_max, max_height)
+                   for col in range(col_min, col_max, max_width)]
+
+        # Download the pixel windows as GeoTIFFs, mosaicking them when more than one was needed
+        os.makedirs(TILE_CACHE_FOLDER, exist_ok=True)
+        if len(windows) == 1:
+            ProcessLISST.export_image(ga_lisst_rest, windows[0], cache_path)
+        else:
+            stem = os.path.splitext(cache_path)[0]
+            part_paths = [f"{stem}_part{i}.tif" for i in range(len(windows))]
+            for window, part_path in zip(windows, part_paths):
+                ProcessLISST.export_image(ga_lisst_rest, window, part_path)
+
+            # Mosaic in the service's own spatial reference and pixel grid, ignoring the run's environments,
+            # and move the mosaic into place only once it is complete
+            mosaic_path = f"{stem}_mosaic.tif"
+            with arcpy.EnvManager(outputCoordinateSystem=service_sr, extent="MAXOF", snapRaster=None, cellSize="MAXOF",
+                                  pyramid="NONE", rasterStatistics="NONE"):
+                arcpy.management.MosaicToNewRaster(part_paths, TILE_CACHE_FOLDER, os.path.basename(mosaic_path),
+                                                   pixel_type=PIXEL_TYPES[service_json["pixelType"]], number_of_bands=1)
+            arcpy.management.Delete(part_paths)
+            os.replace(mosaic_path, cache_path)
+
+        # Keep only the most recently used tiles
+        cached_paths = [os.path.join(TILE_CACHE_FOLDER, f) for f in os.listdir(TILE_CACHE_FOLDER) if f.endswith(".tif")]
+        cached_paths.sort(key=os.path.getmtime, reverse=True)
+        if len(cached_paths) > TILE_CACHE_SIZE:
+            arcpy.management.Delete(cached_paths[TILE_CACHE_SIZE:])
+
+        return arcpy.Raster(cache_path)
+
+    @staticmethod
+    def get_rank_acres(in_raster, ranks, arr=None):
+        """Tally the acreage of each LISST rank from the raster's cell counts.
+
+        Args:
+            in_raster (arcpy.Raster): The LISST raster masked to the input boundary.
+            ranks (dict): A dictionary of LISST ranks keyed by cell value.
+            arr (numpy.ndarray, optional): The raster's cell values, if already read. Defaults to None.
+        Returns:
+            dict: A dictionary of acreages keyed by LISST rank.
+        """
+        spatial_reference = in_raster.spatialReference
+
+        # Count the cells of each value, skipping NoData
+        if arr is None:
+            arr = arcpy.RasterToNumPyArray(in_raster)
+        counts = _count_values(arr, max(ranks, default=-1) + 1, in_raster.noDataValue)
+
+        # Convert the cell size from the projection's linear units to acres
+        cell_area = in_raster.meanCellWidth * in_raster.meanCellHeight * spatial_reference.metersPerUnit ** 2
+        acres_per_cell = cell_area / SQ_METERS_PER_ACRE
+
+        rank_acres = {}
+        for value, rank in ranks.items():
+            rank_acres[rank] = rank_acres.get(rank, 0.0) + counts[value] * acres_per_cell
+        return rank_acres
+
+    @staticmethod
+    def polygonize(in_raster, arr, out_features):
+        """Convert a raster to polygons, one multipart feature per cell value.
+
+        When rasterio is installed, the cell values already read into memory are polygonized in a single
+        pass and written with their cell edges unchanged, so neighboring values share their boundaries
+        exactly. Otherwise, RasterToPolygon is used with simplified edges. Either way, the cell value is
+        written to a gridcode field.
+
+        Args:
+            in_raster (arcpy.Raster): The raster to convert.
+            arr (numpy.ndarray): The raster's cell values.
+            out_features (str): Path to the output polygon feature class.
+        """
+        rasterio = _get_rasterio()
+        if rasterio is None:
+            arcpy.conversion.RasterToPolygon(in_raster, out_features, "SIMPLIFY", "Value", "MULTIPLE_OUTER_PART")
+            return
+
+        # Mask NoData and non-finite cells before any cast, which would change their values
+        mask = numpy.ones(arr.shape, bool)
+        if arr.dtype.kind == "f":
+            mask &= numpy.isfinite(arr)
+        if in_raster.noDataValue is not None:
+            mask &= arr != in_raster.noDataValue
+
+        # Gather the polygons of each cell value into one multipart polygon
+        if arr.dtype.name not in ("uint8", "uint16", "int16", "int32"):
+            arr = numpy.where(mask, arr, 0).astype(numpy.int32)
+        transform = rasterio.transform.from_origin(in_raster.extent.XMin, in_raster.extent.YMax,
+                                                   in_raster.meanCellWidth, in_raster.meanCellHeight)
+        value_polygons = collections.defaultdict(list)
+        for polygon, value in rasterio.features.shapes(arr, mask=mask, transform=transform):
+            value_polygons[int(value)].append(polygon["coordinates"])
+
+        # Write the polygons along the cell edges; simplifying each value on its own would open gaps and overlaps
+        out_path, out_name = os.path.split(out_features)
+        arcpy.management.CreateFeatureclass(out_path, out_name, "POLYGON", spatial_reference=in_raster.spatialReference)
+        arcpy.management.AddField(out_features, "gridcode", "LONG")
+        with arcpy.da.InsertCursor(out_features, ["SHAPE@", "gridcode"]) as cursor:
+            for value, polygons in value_polygons.items():
+                shape = arcpy.AsShape({"type": "MultiPolygon", "coordinates": polygons})
+                cursor.insertRow([shape, value])
+
+    @staticmethod
+    def process_tile(ga_lisst_rest, ranks, tile, tile_number, buffered_boundary, in_boundary):
+        """Extract, vectorize, and tally the GA LISST data within a single tile.
+
+        Args:
+            ga_lisst_rest (str): URL of the GA LISST image service.
+            ranks (dict): A dictionary of LISST ranks keyed by cell value.
+            tile (arcpy.Polygon): The tile geometry.
+            tile_number (int): The tile's number, used to name its intermediate outputs.
+            buffered_boundary (str): Path to the buffered input boundary.
+            in_boundary (str): Path to the input boundary feature class.
+        Returns:
+            tuple: A dictionary of acreages keyed by LISST rank, the path to the tile's polygon (or None if
+                no cells of the tile fall within the original boundary), and the path to the tile's clipped
+                buffer, left for the caller to delete with the other temp layers.
+        """
+        out_tile_buffer_path = f"memory\\tile_buffer_{tile_number}"
+        out_tile_polygon_path = f"memory\\tile_{tile_number}"
+
+        with arcpy.EnvManager(extent=tile.extent):
+            # Clip the buffer to the tile
+            arcpy.analysis.PairwiseClip(buffered_boundary, tile, out_tile_buffer_path)
+
+            # Download the raster for the tile's buffer extent, reusing a cached copy from earlier runs
+            tile_raster = ProcessLISST.get_cached_raster(ga_lisst_rest, arcpy.Describe(out_tile_buffer_path).extent)
+
+            # Clip the raster to the tile's buffer, keeping it in memory
+            raster_clip = arcpy.sa.ExtractByMask(tile_raster, out_tile_buffer_path)
+
+            # Mask the raster to the original boundary so only the cells within it are tallied and vectorized
+            boundary_raster = arcpy.sa.ExtractByMask(raster_clip, in_boundary)
+
+            # Read the cell values once for both the tally and the conversion to polygons
+            arr = arcpy.RasterToNumPyArray(boundary_raster)
+
+            # Skip the tile if none of its cells fall within the original boundary
+            if boundary_raster.noDataValue is not None and not (arr != boundary_raster.noDataValue).any():
+                return {}, None, out_tile_buffer_path
+
+            # Calculate acreages from the raster cells within the original boundary
+            rank_acres = ProcessLISST.get_rank_acres(boundary_raster, ranks, arr)
+
+            # Convert raster to polygon, one multipart feature per cell value
+            ProcessLISST.polygonize(boundary_raster, arr, out_tile_polygon_path)
+
+        return rank_acres, out_tile_polygon_path, out_tile_buffer_path
+
     @staticmethod
     def get_lisst(in_boundary, output_folder, ga_lisst_polygon_param):
         """Retrieve GA LISST data and process to calculate acreages.
@@ -185,6 +551,18 @@ class ProcessLISST(object):
         Returns:
             dict: A dictionary containing the path to the output polygon, or None on failure.
         """
+        # Buffer progress messages and write them before each long-running step and at the end of each stage
+        msg = MessageBuffer()
+
+        # Define REST endpoint
+        ga_lisst_rest = "https://tiledimageservices.arcgis.com/F7DSX1DSNSiWmOqh/arcgis/rest/services/OverallPref_Nov2023_createhostedimagery/ImageServer"
+
+        # Fetch the LISST REST service's JSON description in the background while the workspace is prepared;
+        # only urllib runs on the worker thread, since arcpy is not thread-safe
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        service_json_future = executor.submit(ProcessLISST.get_service_json, ga_lisst_rest)
+        executor.shutdown(wait=False)
+
         # Determine the project's home folder
         project_home_folder = ProcessLISST.get_project_home_folder()
         if not project_home_folder:
@@ -195,102 +573,150 @@ class ProcessLISST(object):
             output_folder = os.path.join(project_home_folder, "ga_lisst_layers")
         try:
             os.makedirs(output_folder, exist_ok=True)
-            arcpy.AddMessage(f"Workspace: {output_folder} created for storing output files.")
+            msg.add(f"Workspace: {output_folder} created for storing output files.")
         except Exception as e:
+            msg.flush()
             arcpy.AddError(f"Error creating output folder: {e}")
             return None
 
         arcpy.env.workspace = output_folder
         arcpy.env.overwriteOutput = True
 
-        # Check out Spatial Analyst extension
-        if arcpy.CheckExtension("Spatial") == "Available":
-            arcpy.CheckOutExtension("Spatial")
-        else:
+        # Check that the Spatial Analyst extension is available; it is checked out only while processing
+        if arcpy.CheckExtension("Spatial") != "Available":
+            msg.flush()
             arcpy.AddError("Spatial Analyst extension is not available.")
             return None
 
-        # Set the output coordinate system
+        # Set the output coordinate system, projecting to an equal-area system when the input boundary is not projected
         try:
-            desc = arcpy.Describe(in_boundary)
-            arcpy.env.outputCoordinateSystem = desc.spatialReference
-            arcpy.AddMessage(f"Output spatial reference set to: {arcpy.env.outputCoordinateSystem.name}")
+            desc_in = arcpy.Describe(in_boundary)
+            output_sr = desc_in.spatialReference
+            if output_sr.type != "Projected":
+                output_sr = arcpy.SpatialReference(EQUAL_AREA_WKID)
+                msg.add(f"Input boundary is not projected. Acreages will be calculated in {output_sr.name}.")
+            arcpy.env.outputCoordinateSystem = output_sr
+            msg.add(f"Output spatial reference set to: {output_sr.name}")
         except Exception as e:
+            msg.flush()
             arcpy.AddError(f"Error getting input boundary spatial reference: {e}")
             return None  # Exit if we can't set the coordinate system.
 
-        # Define output names *within* the output folder
-        out_temp_raster_path = os.path.join(output_folder, "lisst_clip_temp.tif")
-        out_temp_polygon_path = os.path.join(output_folder, "lisst_poly_temp.shp")
-        out_clip_polygon_path = os.path.join(output_folder, "lisst_clip_poly.shp")
+        # Define intermediate names in memory and the output name *within* the output folder
+        out_tile_index_path = "memory\\lisst_tiles"
+        out_temp_polygon_path = "memory\\lisst_poly_temp"
         out_lisst_polygon_path = os.path.join(output_folder, "lisst_polygon.shp")
 
-        # Define REST endpoint
-        ga_lisst_rest = "https://tiledimageservices.arcgis.com/F7DSX1DSNSiWmOqh/arcgis/rest/services/OverallPref_Nov2023_createhostedimagery/ImageServer"
-
         # Check if LISST REST is valid
-        arcpy.AddMessage(f"Checking GA LISST REST service...")
+        msg.add(f"Checking GA LISST REST service...")
+        msg.flush()
         try:
-            desc = arcpy.Describe(ga_lisst_rest)
-            arcpy.AddMessage(f"GA LISST REST service appears valid and accessible.")
+            service_json_future.result()
+            service_sr = ProcessLISST.get_service_spatial_reference(ga_lisst_rest)
+            msg.add(f"GA LISST REST service appears valid and accessible.")
+            msg.flush()
         except Exception as desc_err:
+            msg.flush()
             arcpy.AddError(f"GA LISST REST service is not available or valid: {desc_err}")
             return None
 
         # --- GA LISST Processing --- #
-        arcpy.AddMessage(f"Processing GA LISST data...")
-
-        # Set processing extent and snap raster
-        arcpy.AddMessage(f"Setting processing extent...")
+        msg.add(f"Processing GA LISST data...")
 
         try:
-            with arcpy.EnvManager(extent=in_boundary, snapRaster=ga_lisst_rest, cellSize=ga_lisst_rest):
-                # Create a 100ft buffer around the input boundary
-                arcpy.AddMessage(f"Buffering the input boundary by 100ft...")
-                buffered_boundary = arcpy.analysis.Buffer(in_boundary, "memory\\buffered_boundary", "100 Feet")
-
-                # Clip the raster to the buffer
-                arcpy.AddMessage(f"Clipping the LISST raster to the buffer...")
-                raster_clip = arcpy.sa.ExtractByMask(ga_lisst_rest, buffered_boundary)
-
-                # Save the temporary clipped raster
-                arcpy.AddMessage(f"Saving temporary clipped raster to: {out_temp_raster_path}")
-                raster_clip.save(out_temp_raster_path)
+            # Use the LISST raster's own spatial reference and cell size when the output shares its
+            # spatial reference, so the raster is never reprojected
+            if service_sr.factoryCode and output_sr.factoryCode == service_sr.factoryCode:
+                arcpy.env.outputCoordinateSystem = service_sr
+                cell_size = ProcessLISST.get_service_json(ga_lisst_rest)["pixelSizeX"]
+                msg.add(f"Input boundary shares the GA LISST spatial reference. The raster will not be reprojected.")
+            else:
+                cell_size = ga_lisst_rest
+                msg.add(f"The GA LISST raster will be reprojected to {output_sr.name} to calculate acreages.")
 
-                # Convert raster to polygon
-                arcpy.AddMessage(f"Converting the LISST raster to a polygon feature layer...")
-                arcpy.conversion.RasterToPolygon(out_temp_raster_path, out_temp_polygon_path, "NO_SIMPLIFY", "Rank")
+            # Set snap raster and cell size; the processing extent is set per tile
+            msg.add(f"Setting snap raster and cell size...")
 
-                # Clip the polygon to the original boundary
-                arcpy.AddMessage(f"Clipping the polygon to the original input boundary...")
-                arcpy.analysis.Clip(out_temp_polygon_path, in_boundary, out_clip_polygon_path)
+            with _spatial_license(), arcpy.EnvManager(snapRaster=ga_lisst_rest, cellSize=cell_size):
+                # Create a 100ft buffer around the input boundary
+                msg.add(f"Buffering the input boundary by 100ft...")
+                msg.flush()
+                buffered_boundary = arcpy.analysis.PairwiseBuffer(in_boundary, "memory\\buffered_boundary", "100 Feet", dissolve_option="ALL")[0]
+
+                # Split the input boundary into tiles to bound memory use on large boundaries
+                msg.add(f"Splitting the input boundary into {TILE_SIZE} tiles...")
+                msg.flush()
+                arcpy.cartography.GridIndexFeatures(out_tile_index_path, in_boundary, "INTERSECTFEATURE", "NO_USEPAGEUNIT",
+                                                    polygon_width=TILE_SIZE, polygon_height=TILE_SIZE)
+
+                # Look up the rank of each cell value
+                ranks = ProcessLISST.get_service_ranks(ga_lisst_rest)
+
+                # Clip, convert, and tally the LISST raster one tile at a time
+                rank_acres = collections.Counter()
+                tile_polygon_paths = []
+                tile_buffer_paths = []
+                with arcpy.da.SearchCursor(out_tile_index_path, ["SHAPE@"]) as cursor:
+                    for tile_number, (tile,) in enumerate(cursor, start=1):
+                        msg.add(f"Clipping and converting the LISST raster for tile {tile_number}...")
+                        msg.flush()
+                        tile_rank_acres, tile_polygon_path, tile_buffer_path = ProcessLISST.process_tile(
+                            ga_lisst_rest, ranks, tile, tile_number, buffered_boundary, in_boundary
+                        )
+                        rank_acres.update(tile_rank_acres)
+                        tile_buffer_paths.append(tile_buffer_path)
+                        if tile_polygon_path:
+                            tile_polygon_paths.append(tile_polygon_path)
+
+                if not tile_polygon_paths:
+                    raise ValueError("No GA LISST cells fall within the input boundary.")
+
+                # Merge the tiles
+                msg.add(f"Merging the tiles...")
+                msg.flush()
+                arcpy.management.Merge(tile_polygon_paths, out_temp_polygon_path)
+
+                # Assign each polygon the rank of its cell value
+                arcpy.AddField_management(out_temp_polygon_path, "Rank", "TEXT")
+                with arcpy.da.UpdateCursor(out_temp_polygon_path, ["gridcode", "Rank"]) as cursor:
+                    for row in cursor:
+                        if row[0] in ranks:
+                            row[1] = ranks[row[0]]
+                            cursor.updateRow(row)
+                        else:
+                            cursor.deleteRow()  # Cells outside the LISST ranks
 
                 # Dissolve based on Rank field
-                arcpy.AddMessage(f"Dissolving the polygon based on Rank field...")
-                arcpy.Dissolve_management(out_clip_polygon_path, out_lisst_polygon_path, "Rank")
+                msg.add(f"Dissolving the polygon based on Rank field...")
+                msg.flush()
+                arcpy.analysis.PairwiseDissolve(out_temp_polygon_path, out_lisst_polygon_path, "Rank")
 
-                # Caculate new ACRES field
-                arcpy.AddMessage(f"Calculating acreages for each rank...")
-                # Add a field to store area in acres
+                # Write the acreages to a new ACRES field based on Rank field
+                msg.add(f"Writing acreages for each rank...")
                 arcpy.AddField_management(out_lisst_polygon_path, "ACRES", "DOUBLE")
-                arcpy.CalculateField_management(out_lisst_polygon_path, "ACRES", "!shape.area@ACRES!", "PYTHON3")
+                with arcpy.da.UpdateCursor(out_lisst_polygon_path, ["Rank", "ACRES"]) as cursor:
+                    for row in cursor:
+                        row[1] = rank_acres[row[0]]
+                        cursor.updateRow(row)
 
                 # Delete the temp layers
-                arcpy.AddMessage(f"Deleting the temporary layers...")
-                arcpy.management.Delete(out_temp_polygon_path)
-                arcpy.management.Delete(out_temp_raster_path)
-                arcpy.management.Delete(out_clip_polygon_path)
-                arcpy.management.Delete(buffered_boundary)
+                msg.add(f"Deleting the temporary layers...")
+                arcpy.management.Delete(tile_polygon_paths + tile_buffer_paths +
+                                        [out_temp_polygon_path, out_tile_index_path, buffered_boundary])
 
-                arcpy.AddMessage(f"LISST data processed successfully. Output polygon: {out_lisst_polygon_path}")
+                msg.add(f"LISST data processed successfully. Output polygon: {out_lisst_polygon_path}")
+                msg.flush()
 
         except IOError as e:
+            msg.flush()
             arcpy.AddError(f"File/Service Access Error: {str(e)}")
             return None
         except ValueError as e:
+            msg.flush()
             arcpy.AddError(f"Input Value Error: {str(e)}")
             return None
         except arcpy.ExecuteError:
+            msg.flush()
             msgs = arcpy.GetMessages(2)
             arcpy.AddError("ArcPy Execution Error:")
             arcpy.AddError(msgs)
@@ -298,6 +724,8 @@ class ProcessLISST(object):
             arcpy.AddMessage(arcpy.GetMessages(0))
             return None
         except Exception as e:
+            import traceback
+            msg.flush()
             arcpy.AddError(f"An unexpected error occurred: {type(e).__name__} - {e}")
             arcpy.AddError(traceback.format_exc())  # Log the full traceback
             return None
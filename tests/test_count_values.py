@@ -0,0 +1,53 @@
+"""Check that the toolbox's cell count matches a plain numpy.bincount of the valid cells."""
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import unittest
+import unittest.mock
+
+import numpy
+
+# The count does not use arcpy, so the toolbox can be loaded outside ArcGIS Pro
+sys.modules.setdefault("arcpy", unittest.mock.MagicMock())
+
+TOOLBOX_PATH = os.path.join(os.path.dirname(__file__), "..", "toolbox", "KH GA LISST.pyt")
+loader = importlib.machinery.SourceFileLoader("kh_ga_lisst", TOOLBOX_PATH)
+spec = importlib.util.spec_from_loader(loader.name, loader)
+toolbox = importlib.util.module_from_spec(spec)
+loader.exec_module(toolbox)
+
+
+class CountValuesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.values = numpy.random.default_rng(0).integers(0, 6, (400, 400))
+
+    def assert_counts(self, arr, nodata, expected_cells):
+        counts = toolbox._count_values(arr, 5, nodata)
+        numpy.testing.assert_array_equal(counts, numpy.bincount(expected_cells, minlength=5))
+
+    def test_uint8(self):
+        arr = self.values.astype(numpy.uint8)
+        arr[:10] = 255
+        self.assert_counts(arr, 255, self.values[10:].ravel())
+
+    def test_int16(self):
+        arr = self.values.astype(numpy.int16)
+        arr[:10] = -32768
+        self.assert_counts(arr, -32768, self.values[10:].ravel())
+
+    def test_float_nodata(self):
+        arr = self.values.astype(numpy.float32)
+        arr[:10] = numpy.finfo(numpy.float32).min
+        arr[10:20] = numpy.nan
+        self.assert_counts(arr, float(numpy.finfo(numpy.float32).min), self.values[20:].ravel())
+
+    def test_no_nodata(self):
+        arr = self.values.astype(numpy.uint8)
+        self.assert_counts(arr, None, self.values.ravel())
+
+
+if __name__ == "__main__":
+    unittest.main()